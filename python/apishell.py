@@ -7,6 +7,7 @@ import sys, os, os.path
 from contextlib import closing
 
 from destinyapi import DAPI, DAPIError, Character, load_manifest, get_hash_for_db, get_hash_from_db
+from destinyapi import enable_profiling, disable_profiling, get_profiler
 from destinyapi.helpers import print_character_stats, get_characters_from_username
 
 try:
@@ -38,7 +39,49 @@ class DAPIPrompt(Prompts):
             (Token.OutPrompt, '>: '),
         ]
 
+def dapi_profile(line):
+    '''Controls the DAPI profiler
+
+    Usage: %dapi_profile on [sample_interval] | off | report | reset | dump [stacks_path]
+
+    "dump" writes the sampled stacks to `stacks_path` (or the --profile-output path)
+    '''
+    args = line.split()
+    cmd = args.pop(0).lower() if args else 'report'
+
+    try:
+        if cmd == 'on':
+            enable_profiling(sample_interval=(float(args[0]) if args else None))
+            print 'Profiling enabled'
+        elif cmd == 'off':
+            prof = disable_profiling()
+            if prof:
+                print prof.summary()
+        elif cmd in ['report', 'reset', 'dump']:
+            prof = get_profiler()
+            if not prof:
+                print 'Profiling is not enabled (use "%dapi_profile on")'
+            elif cmd == 'reset':
+                prof.reset()
+            elif cmd == 'report':
+                print prof.summary()
+            else:
+                prof.dump(out_path=(args[0] if args else prof.out_path), stream=sys.stdout)
+        else:
+            print dapi_profile.__doc__
+    except (DAPIError, ValueError), ex:
+        print >>sys.stderr,'Error: %s' % str(ex)
+
 def main():
+    parser = argparse.ArgumentParser(description='Interactive shell for the Destiny API')
+    parser.add_argument('--profile', action='store_true', help='Record per-phase and per-endpoint timings')
+    parser.add_argument('--profile-output', metavar='PATH',
+                        help='Also sample stacks and write them in flamegraph (collapsed) format to PATH at exit')
+    args = parser.parse_args()
+
+    if args.profile or args.profile_output:
+        enable_profiling(sample_interval=(0.005 if args.profile_output else None), out_path=args.profile_output)
+
     try:
         get_ipython
     except NameError:
@@ -56,6 +99,7 @@ def main():
     cfg.TerminalInteractiveShell.debug = True
 
     ipshell = InteractiveShellEmbed.instance(config=cfg, banner1=_banner)
+    ipshell.register_magic_function(dapi_profile, magic_name='dapi_profile')
     api_key = None
 
     if os.path.exists(os.path.expanduser('~/.dapi.key')):
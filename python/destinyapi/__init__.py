@@ -6,4 +6,7 @@ from .exc import DAPIError
 from .base import DAPI
 from .character import Character
 from .helpers import print_character_stats
+from .activities import iter_activity_history
 from .manifests import get_hash_for_db, get_hash_from_db, load_manifest
+from .snapshots import SnapshotStore
+from .profiler import enable_profiling, disable_profiling, get_profiler
@@ -0,0 +1,118 @@
+'''
+destinyapi - Destiny API Wrapper for Python
+
+This file provides a lazy, paginated iterator over a character's activity history
+which prefetches upcoming pages and post-game carnage reports in the background
+
+'''
+
+import types
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+from .exc import DAPIError
+
+def get_activity_id(activity):
+    '''Returns the activity instance ID of an activity history entry (or None if it is missing)'''
+    return activity.get('activityDetails', {}).get('instanceId', None)
+
+def iter_activity_history(dapi, character_id, membership_id=None, mode='None', page_size=25, prefetch=2,
+                          stop_at=None, with_reports=False, workers=4):
+    '''Walks a character's activity history, newest first, one page at a time. While the caller processes a page the
+    next `prefetch` pages are fetched in the background, and if requested the post-game carnage reports of each page
+    are fetched concurrently before the page is yielded.
+
+    Args:
+        dapi (`DAPI` object): An instance of a configured `DAPI` object to use
+        character_id (str): The character to fetch the activity history of
+        membership_id (str): The membership ID of the character (defaults to the configured user)
+        mode (str): The activity mode to filter on (defaults to 'None', which includes all activities)
+        page_size (int): Number of activities requested per page (defaults to 25)
+        prefetch (int): Number of pages to fetch ahead of the one being processed (defaults to 2). With 0 each page is
+        only requested once the previous one has been consumed
+        stop_at (str or iterable): Activity instance ID(s) which have already been seen. Iteration stops, without
+        yielding it, at the first of these encountered, allowing for incremental syncs
+        with_reports (boolean): Determines if the post-game carnage report of each activity should be fetched and
+        stored in its "pgcr" key (defaults to False)
+        workers (int): Number of threads used for prefetching pages and reports (defaults to 4)
+
+    Returns:
+        generator: Yields each activity dict from the history
+    '''
+    if page_size < 1:
+        raise DAPIError('Invalid page size requested: %r' % page_size)
+
+    if prefetch < 0:
+        raise DAPIError('Invalid prefetch count requested: %r' % prefetch)
+
+    if workers < 1:
+        raise DAPIError('Invalid worker count requested: %r' % workers)
+
+    membership_id = dapi._validate_membership_id(membership_id)
+
+    if stop_at is None:
+        stop_at = set()
+    elif isinstance(stop_at, (types.StringTypes, int, long)):
+        stop_at = set([str(stop_at)])
+    else:
+        stop_at = set(map(str, stop_at))
+
+    return _iter_activity_history(dapi, character_id, membership_id, mode, page_size, prefetch, stop_at,
+                                  with_reports, workers)
+
+def _wait(result, poll_interval=0.5):
+    # ApplyResult.get() without a timeout can't be interrupted by Ctrl-C in Python 2
+    while not result.ready():
+        result.wait(poll_interval)
+    return result.get()
+
+def _iter_activity_history(dapi, character_id, membership_id, mode, page_size, prefetch, stop_at, with_reports,
+                           workers):
+    pool = ThreadPool(workers)
+    pending = deque()
+    state = {'next_page': 0, 'last_page': False}
+
+    def _submit():
+        kwargs = {'membership_id': membership_id, 'mode': mode, 'page': state['next_page'], 'count': page_size}
+        pending.append(pool.apply_async(dapi.get_activity_history, (character_id,), kwargs))
+        state['next_page'] += 1
+
+    try:
+        _submit()
+
+        while pending:
+            activities = _wait(pending.popleft())
+            if not activities:
+                return
+
+            if len(activities) < page_size:
+                state['last_page'] = True
+
+            for idx, act in enumerate(activities):
+                if str(get_activity_id(act)) in stop_at:
+                    activities = activities[:idx]
+                    state['last_page'] = True
+                    break
+
+            # Only look ahead once the page is known not to contain an already-seen activity
+            while not state['last_page'] and len(pending) < prefetch:
+                _submit()
+
+            if with_reports:
+                reports = [(act, pool.apply_async(dapi.get_post_game_report, (get_activity_id(act),)))
+                           for act in activities if get_activity_id(act) is not None]
+                for act, report in reports:
+                    act['pgcr'] = _wait(report)
+
+            for act in activities:
+                yield act
+
+            if state['last_page']:
+                return
+
+            if not pending:
+                _submit()
+    finally:
+        pool.terminate()
+
+__all__ = ['iter_activity_history', 'get_activity_id']
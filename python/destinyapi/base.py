@@ -14,13 +14,22 @@ except NameError:
     pass
 
 from .exc import DAPIError
+from . import profiler
+from .activities import iter_activity_history
+from .snapshots import SnapshotStore
 
 class DAPI(object):
     _base_url = 'https://www.bungie.net/platform/destiny/'
     _headers = {}
     _user_data = {}
+    _timeout = 30
+
+    def __init__(self, api_key, username=None, load_data=False, profile=None):
+        if profile:
+            profiler.enable_profiling(sample_interval=(profile if isinstance(profile, float) else None))
+        elif profile is None:
+            profiler.enable_from_env()
 
-    def __init__(self, api_key, username=None, load_data=False):
         if username:
             self._set_username(username)
         else:
@@ -75,6 +84,31 @@ class DAPI(object):
 
         return self._user_data
 
+    def save_snapshot(self, store):
+        membership_id = self._validate_membership_id(None)
+
+        if isinstance(store, SnapshotStore):
+            return store.save(membership_id, self._user_data)
+
+        with SnapshotStore(store) as snapshots:
+            return snapshots.save(membership_id, self._user_data)
+
+    def load_snapshot(self, store, membership_id):
+        if isinstance(store, SnapshotStore):
+            user_data = store.load(membership_id)
+        else:
+            if not os.path.exists(store):
+                raise DAPIError('Unable to find snapshot store "%s"' % store)
+
+            with SnapshotStore(store) as snapshots:
+                user_data = snapshots.load(membership_id)
+
+        if user_data is None:
+            raise DAPIError('No snapshot found for membership ID "%s"' % membership_id)
+
+        self._user_data = user_data
+        return self._user_data
+
     def _set_username(self, username, silent=True):
         if not username:
             return False
@@ -167,7 +201,22 @@ class DAPI(object):
         membership_id = self._validate_membership_id(membership_id)
         return self._call('1/Account/%s/Items/' % membership_id)
 
-    def _call(self, request_path, *args, **kwargs):
+    def get_activity_history(self, character_id, membership_id=None, mode='None', page=0, count=25):
+        membership_id = self._validate_membership_id(membership_id)
+        res = self._call('Stats/ActivityHistory/1/%s/%s/' % (membership_id, character_id),
+                         params={'mode': mode, 'page': page, 'count': count})
+
+        if not res:
+            return []
+        return res.get('activities', [])
+
+    def get_post_game_report(self, activity_id):
+        return self._call('Stats/PostGameCarnageReport/%s/' % activity_id)
+
+    def iter_activity_history(self, character_id, membership_id=None, **kwargs):
+        return iter_activity_history(self, character_id, membership_id=membership_id, **kwargs)
+
+    def _call(self, request_path, params=None, *args, **kwargs):
         if request_path.startswith('/'):
             request_path = request_path[1:]
 
@@ -175,10 +224,15 @@ class DAPI(object):
             request_path = '%s/' % request_path
 
         u = '%s/%s' % (self._base_url, request_path)
+        endpoint = profiler.normalize_endpoint(request_path)
 
         try:
-            with closing(requests.get(u, headers=self._headers)) as req:
-                data = req.json()
+            with profiler.phase(profiler.PHASE_NETWORK, endpoint=endpoint):
+                req = requests.get(u, headers=self._headers, params=params, timeout=self._timeout)
+
+            with closing(req):
+                with profiler.phase(profiler.PHASE_DECODE, endpoint=endpoint):
+                    data = req.json()
 
                 error_stat = data.get('ErrorStatus', 'UnknownError')
                 if error_stat != 'Success':
@@ -197,3 +251,5 @@ class DAPI(object):
                 return res
         except requests.exceptions.RequestsWarning,ex:
             raise DAPIError('Error in API request for "%s": "%s"' % (request_path, str(ex)), base_ex=ex)
+        except requests.RequestException,ex:
+            raise DAPIError('Error in API request for "%s": "%s"' % (request_path, str(ex)), base_ex=ex)
@@ -9,6 +9,7 @@ from datetime import datetime
 from pandas import DataFrame
 
 from .exc import DAPIError
+from . import profiler
 
 class Character(object):
     '''Represents the Destiny API character object and provides associated functionality'''
@@ -96,6 +97,7 @@ class Character(object):
             raise DAPIError('Unable to fetch character: "%s"' % str(ex))
 
     @classmethod
+    @profiler.timed(profiler.PHASE_PARSE)
     def from_api(cls, api_obj):
         kwargs = {}
         if 'characterBase' in api_obj:
@@ -191,7 +193,8 @@ class Character(object):
             lrow = tbl.pop()
             tbl.append([lrow[0], '- '*8, lrow[1]])
 
-        return DataFrame(tbl).to_string(index=False, header=False)
+        with profiler.phase(profiler.PHASE_FORMAT):
+            return DataFrame(tbl).to_string(index=False, header=False)
 
     level = property(fget=lambda self: self._level, doc='Base Character Level')
     light_level = property(fget=lambda self: self._light_level, doc='Light Level')
@@ -7,6 +7,7 @@ objects
 '''
 
 from .exc import DAPIError
+from . import profiler
 from pandas import DataFrame
 import ctypes
 
@@ -83,7 +84,8 @@ def print_character_stats(character, silent=False):
             lrow = tbl.pop()
             tbl.append([lrow[0], '- '*8, lrow[1]])
 
-    out_stats['text'] = '%s\n%s' % (out_stats['text'], DataFrame(tbl).to_string(index=False, header=False))
+    with profiler.phase(profiler.PHASE_FORMAT):
+        out_stats['text'] = '%s\n%s' % (out_stats['text'], DataFrame(tbl).to_string(index=False, header=False))
 
     if not silent:
         print out_stats['text']
@@ -5,6 +5,7 @@ import os
 import os.path
 
 from .exc import DAPIError
+from . import profiler
 
 def get_hash_for_db(value):
     return ctypes.c_int(value).value
@@ -12,6 +13,7 @@ def get_hash_for_db(value):
 def get_hash_from_db(value):
     return ctypes.c_uint(value).value
 
+@profiler.timed(profiler.PHASE_MANIFEST)
 def load_manifest(db_path, name):
     if not os.path.exists(db_path):
         raise DAPIError('Database does not exist at "%s"' % db_path)
@@ -0,0 +1,340 @@
+'''
+destinyapi - Destiny API Wrapper for Python
+
+This file provides an opt-in profiler which records where the time in a DAPI
+session goes (network, JSON decoding, parsing, manifest lookups and formatting)
+and optionally samples hot stacks in a flamegraph-compatible format
+
+'''
+
+import os
+import re
+import sys
+import time
+import ctypes
+import ctypes.util
+import atexit
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+PHASE_NETWORK = 'network'
+PHASE_DECODE = 'decode'
+PHASE_PARSE = 'parse'
+PHASE_MANIFEST = 'manifest'
+PHASE_FORMAT = 'format'
+
+PROFILE_ENV = 'DAPI_PROFILE'
+
+_id_re = re.compile(r'(?<=/)\d{5,}(?=/|$)')
+
+_active = None
+_exit_registered = False
+
+class _timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+# CLOCK_THREAD_CPUTIME_ID differs between platforms (sys.platform includes the major version on some, ie: "freebsd11")
+_thread_clock_ids = [('linux', 3), ('darwin', 16), ('freebsd', 14)]
+
+# Frames from this module are profiler overhead rather than part of the profiled code
+_own_file = os.path.splitext(os.path.abspath(__file__))[0]
+
+def _load_clock_gettime():
+    clock_ids = [clock_id for prefix, clock_id in _thread_clock_ids if sys.platform.startswith(prefix)]
+    if not clock_ids:
+        return None
+    clock_id = clock_ids[0]
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        func = libc.clock_gettime
+        func.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+        func.restype = ctypes.c_int
+
+        if func(clock_id, ctypes.byref(_timespec())) != 0:
+            return None
+        return lambda ts: func(clock_id, ctypes.byref(ts))
+    except (OSError, AttributeError):
+        return None
+
+_clock_gettime = _load_clock_gettime()
+
+HAS_THREAD_CPU = _clock_gettime is not None
+
+def _thread_cpu_time():
+    '''Returns the CPU time used by the calling thread. On platforms without CLOCK_THREAD_CPUTIME_ID there is no way
+    to measure this from Python 2, so None is returned and CPU time is reported as unavailable'''
+    if _clock_gettime is None:
+        return None
+
+    ts = _timespec()
+    _clock_gettime(ts)
+    return ts.tv_sec + ts.tv_nsec / 1e9
+
+def normalize_endpoint(request_path):
+    '''Collapses membership, character and item IDs in an API path so that calls to the same endpoint are grouped
+    together (ie: "1/Account/4611686018429000000/Summary/" becomes "1/Account/{id}/Summary")'''
+    return _id_re.sub('{id}', request_path.strip('/'))
+
+class Profiler(object):
+    '''Collects wall and per-thread CPU time per phase and per endpoint and, when enabled, periodically samples the
+    stacks of the threads currently inside a phase'''
+
+    def __init__(self, sample_interval=None, out_path=None):
+        self._lock = threading.Lock()
+        self._sample_interval = sample_interval
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        self._phase_depths = {}
+        self.out_path = out_path
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._phases = {}
+            self._endpoints = {}
+            self._samples = {}
+            self._started = time.time()
+
+    def record(self, phase, wall, cpu, endpoint=None):
+        with self._lock:
+            ent = self._phases.setdefault(phase, [0, 0.0, 0.0])
+            ent[0] += 1
+            ent[1] += wall
+            ent[2] += cpu
+
+            if endpoint:
+                ent = self._endpoints.setdefault((phase, endpoint), [0, 0.0, 0.0])
+                ent[0] += 1
+                ent[1] += wall
+                ent[2] += cpu
+
+    @contextmanager
+    def phase(self, name, endpoint=None):
+        ident = threading.current_thread().ident
+        with self._lock:
+            self._phase_depths[ident] = self._phase_depths.get(ident, 0) + 1
+
+        wall_start = time.time()
+        cpu_start = _thread_cpu_time()
+        try:
+            yield self
+        finally:
+            cpu_end = _thread_cpu_time()
+            cpu = (cpu_end - cpu_start) if cpu_start is not None else 0.0
+            self.record(name, time.time() - wall_start, cpu, endpoint=endpoint)
+
+            with self._lock:
+                depth = self._phase_depths.pop(ident) - 1
+                if depth:
+                    self._phase_depths[ident] = depth
+
+    def start_sampling(self, sample_interval=None):
+        '''Starts a daemon thread which, every `sample_interval` seconds of wall time, samples the stacks of the threads
+        currently inside a phase. Idle threads (such as an interactive prompt or a thread pool's housekeeping threads)
+        are never sampled'''
+        if sample_interval:
+            self._sample_interval = sample_interval
+
+        if self._sampler is not None or not self._sample_interval:
+            return False
+
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='dapi-profiler-sampler')
+        self._sampler.daemon = True
+        self._sampler.start()
+        return True
+
+    def stop_sampling(self):
+        if self._sampler is None:
+            return False
+
+        self._stop_sampling.set()
+        if self._sampler is not threading.current_thread():
+            self._sampler.join()
+        self._sampler = None
+        return True
+
+    def _sample_loop(self):
+        while not self._stop_sampling.wait(self._sample_interval):
+            self._take_sample()
+
+    def _take_sample(self):
+        with self._lock:
+            idents = set(self._phase_depths)
+
+        stacks = []
+        for ident, frm in sys._current_frames().items():
+            if ident not in idents:
+                continue
+
+            # Samples taken while the profiler itself is running (ie: reading the clock) are overhead
+            if os.path.splitext(os.path.abspath(frm.f_code.co_filename))[0] == _own_file:
+                continue
+
+            stack = []
+            while frm is not None:
+                code = frm.f_code
+                if os.path.splitext(os.path.abspath(code.co_filename))[0] != _own_file:
+                    stack.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                frm = frm.f_back
+            stack.reverse()
+            stacks.append(';'.join(stack))
+
+        with self._lock:
+            for stack in stacks:
+                self._samples[stack] = self._samples.get(stack, 0) + 1
+
+    def get_stats(self):
+        '''Returns a dict describing the collected phase, endpoint and sample data
+
+        Returns:
+            dict: Contains "elapsed" (seconds since the profiler was reset), "phases" and "endpoints" (dicts mapping
+            to (calls, wall, cpu) tuples) and "samples" (a dict of collapsed stacks to sample counts)
+        '''
+        with self._lock:
+            return {'elapsed': time.time() - self._started,
+                    'phases': dict([(k, tuple(v)) for k,v in self._phases.items()]),
+                    'endpoints': dict([(k, tuple(v)) for k,v in self._endpoints.items()]),
+                    'samples': dict(self._samples)}
+
+    def summary(self, top=10):
+        '''Builds a textual report of the time spent in each phase, the slowest endpoints and the hottest stacks
+
+        Args:
+            top (int): The number of endpoints and stacks to include (defaults to 10)
+
+        Returns:
+            str: The report text
+        '''
+        stats = self.get_stats()
+        cpu_fmt = '%10.03f' if HAS_THREAD_CPU else '%.0s       n/a'
+        lines = ['DAPI profile (%.03fs elapsed)' % stats['elapsed'], '',
+                 '%-10s %8s %10s %10s' % ('Phase', 'Calls', 'Wall (s)', 'CPU (s)')]
+
+        for name, (calls, wall, cpu) in sorted(stats['phases'].items(), key=lambda ent: -ent[1][1]):
+            lines.append(('%-10s %8d %10.03f ' + cpu_fmt) % (name, calls, wall, cpu))
+
+        if stats['endpoints']:
+            lines.extend(['', '%-10s %-40s %8s %10s %10s' % ('Phase', 'Endpoint', 'Calls', 'Wall (s)', 'CPU (s)')])
+            endpoints = sorted(stats['endpoints'].items(), key=lambda ent: -ent[1][1])[:top]
+            for (name, endpoint), (calls, wall, cpu) in endpoints:
+                lines.append(('%-10s %-40s %8d %10.03f ' + cpu_fmt) % (name, endpoint, calls, wall, cpu))
+
+        if stats['samples']:
+            # Stacks are grouped by their innermost frames (leaf first) so that each row is distinct
+            hot = {}
+            for stack, count in stats['samples'].items():
+                label = ' < '.join(reversed(stack.split(';')[-3:]))
+                hot[label] = hot.get(label, 0) + count
+
+            total = sum(hot.values())
+            lines.extend(['', 'Hot stacks (%d samples):' % total])
+            for label, count in sorted(hot.items(), key=lambda ent: -ent[1])[:top]:
+                lines.append('%5.01f%%  %s' % (100.0 * count / total, label))
+
+        return '\n'.join(lines)
+
+    def dump(self, out_path=None, stream=None):
+        '''Writes the summary to `stream` (defaults to stderr) and, if `out_path` is provided, the sampled stacks in
+        the collapsed format understood by flamegraph.pl and speedscope
+
+        Returns:
+            str: The summary text
+        '''
+        text = self.summary()
+        print >>(stream or sys.stderr), text
+
+        if out_path:
+            samples = self.get_stats()['samples']
+            with open(out_path, 'w') as f:
+                for stack, count in sorted(samples.items()):
+                    f.write('%s %d\n' % (stack, count))
+
+        return text
+
+def get_profiler():
+    '''Returns the active `Profiler` or None if profiling is not enabled'''
+    return _active
+
+def enable_profiling(sample_interval=None, out_path=None, dump_at_exit=True):
+    '''Enables profiling for all DAPI sessions in this process, returning the active `Profiler`
+
+    Args:
+        sample_interval (float): Seconds of wall time between stack samples. Sampling is disabled when None (the
+        default)
+        out_path (str): Optional path to write the collapsed stacks to when the profile is dumped at exit. The most
+        recently provided path is used
+        dump_at_exit (boolean): Determines if the summary is printed when the interpreter exits (defaults to True)
+
+    Returns:
+        `Profiler`: The active profiler
+    '''
+    global _active, _exit_registered
+
+    if _active is None:
+        _active = Profiler(sample_interval=sample_interval)
+
+    if out_path:
+        _active.out_path = out_path
+
+    if dump_at_exit and not _exit_registered:
+        atexit.register(_dump_at_exit)
+        _exit_registered = True
+
+    if sample_interval:
+        _active.start_sampling(sample_interval)
+
+    return _active
+
+def disable_profiling():
+    '''Stops profiling and returns the profiler that was active (or None)'''
+    global _active
+
+    prof, _active = _active, None
+    if prof is not None:
+        prof.stop_sampling()
+
+    return prof
+
+def enable_from_env():
+    '''Enables profiling if the DAPI_PROFILE environment variable is set. A value of "1" only records phase timings,
+    any other value is used as the path to write sampled stacks to at exit'''
+    value = os.environ.get(PROFILE_ENV, '').strip()
+    if not value or value == '0':
+        return None
+
+    if value == '1':
+        return enable_profiling()
+
+    return enable_profiling(sample_interval=0.005, out_path=value)
+
+def _dump_at_exit():
+    if _active is not None:
+        _active.stop_sampling()
+        _active.dump(_active.out_path)
+
+@contextmanager
+def phase(name, endpoint=None):
+    '''Times the enclosed block under `name` if profiling is enabled, otherwise does nothing'''
+    prof = _active
+    if prof is None:
+        yield None
+    else:
+        with prof.phase(name, endpoint=endpoint):
+            yield prof
+
+def timed(name):
+    '''Decorator which times each call of the wrapped function under `name` while profiling is enabled'''
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+__all__ = ['Profiler', 'get_profiler', 'enable_profiling', 'disable_profiling', 'enable_from_env', 'phase', 'timed',
+           'normalize_endpoint', 'PHASE_NETWORK', 'PHASE_DECODE', 'PHASE_PARSE', 'PHASE_MANIFEST', 'PHASE_FORMAT']
@@ -0,0 +1,161 @@
+'''
+destinyapi - Destiny API Wrapper for Python
+
+This file provides a compact on-disk store for many account snapshots (the
+`DAPI` user data) kept in a single file and indexed by membership ID
+
+'''
+
+import os
+import os.path
+import json
+import time
+import zlib
+import sqlite3
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .exc import DAPIError
+
+class SnapshotStore(object):
+    '''A single-file store of compressed account snapshots. Snapshots are kept as zlib-compressed JSON in an SQLite
+    table keyed by membership ID, so a single account can be loaded without reading any of the others.'''
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, db_path, compress_level=6):
+        self._db_path = db_path
+        self._compress_level = compress_level
+
+        try:
+            self._conn = sqlite3.connect(db_path)
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to open snapshot store "%s": %s' % (db_path, str(ex)), base_ex=ex)
+
+        try:
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            tables = self._conn.execute('SELECT COUNT(*) FROM sqlite_master WHERE type = "table"').fetchone()[0]
+
+            if version == 0:
+                if tables:
+                    raise DAPIError('"%s" is an existing database and not a snapshot store' % db_path)
+
+                with self._conn:
+                    self._conn.execute('CREATE TABLE IF NOT EXISTS snapshots (membership_id TEXT PRIMARY KEY, '
+                                       'saved_at REAL NOT NULL, data BLOB NOT NULL)')
+                    self._conn.execute('PRAGMA user_version = %d' % self.FORMAT_VERSION)
+            elif version != self.FORMAT_VERSION:
+                raise DAPIError('Unsupported snapshot store version %d in "%s"' % (version, db_path))
+        except DAPIError:
+            self._conn.close()
+            raise
+        except sqlite3.DatabaseError, ex:
+            self._conn.close()
+            raise DAPIError('Unable to open snapshot store "%s": %s' % (db_path, str(ex)), base_ex=ex)
+
+    def _fetch_one(self, query, membership_id):
+        try:
+            return self._conn.execute(query, (str(membership_id),)).fetchone()
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to read snapshot for "%s": %s' % (membership_id, str(ex)), base_ex=ex)
+
+    def save(self, membership_id, user_data):
+        '''Stores (or replaces) the snapshot for `membership_id`
+
+        Args:
+            membership_id (str): The membership ID the snapshot belongs to
+            user_data (dict): The account data to store (ie: `DAPI._user_data`)
+        '''
+        data = zlib.compress(json.dumps(user_data, separators=(',', ':')), self._compress_level)
+
+        try:
+            with self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO snapshots (membership_id, saved_at, data) VALUES (?, ?, ?)',
+                                   (str(membership_id), time.time(), sqlite3.Binary(data)))
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to save snapshot for "%s": %s' % (membership_id, str(ex)), base_ex=ex)
+
+        return True
+
+    def load(self, membership_id, default=None):
+        '''Loads the snapshot for `membership_id`, returning `default` if there is none'''
+        row = self._fetch_one('SELECT data FROM snapshots WHERE membership_id = ?', membership_id)
+        if not row:
+            return default
+
+        try:
+            return json.loads(zlib.decompress(str(row[0])))
+        except (zlib.error, ValueError), ex:
+            raise DAPIError('Corrupt snapshot for "%s": %s' % (membership_id, str(ex)), base_ex=ex)
+
+    def get_saved_at(self, membership_id):
+        '''Returns the time (in seconds since the epoch) the snapshot for `membership_id` was saved, or None'''
+        row = self._fetch_one('SELECT saved_at FROM snapshots WHERE membership_id = ?', membership_id)
+        return row[0] if row else None
+
+    def delete(self, membership_id):
+        try:
+            with self._conn:
+                cur = self._conn.execute('DELETE FROM snapshots WHERE membership_id = ?', (str(membership_id),))
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to delete snapshot for "%s": %s' % (membership_id, str(ex)), base_ex=ex)
+        return cur.rowcount > 0
+
+    def membership_ids(self):
+        try:
+            return [row[0] for row in self._conn.execute('SELECT membership_id FROM snapshots ORDER BY membership_id')]
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to list snapshots: %s' % str(ex), base_ex=ex)
+
+    def import_user_data(self, data_file):
+        '''Imports a pickled user data file written by `DAPI.save_user_data`
+
+        Returns:
+            str: The membership ID the user data was stored under
+        '''
+        if not os.path.exists(data_file):
+            raise DAPIError('Unable to read user_data from file "%s"' % data_file)
+
+        with open(data_file, 'rb') as f:
+            user_data = pickle.load(f)
+
+        if not user_data or 'membershipId' not in user_data:
+            raise DAPIError('No "membershipId" present in user_data from file "%s"' % data_file)
+
+        self.save(user_data['membershipId'], user_data)
+        return user_data['membershipId']
+
+    def compact(self):
+        '''Reclaims space left behind by replaced or deleted snapshots'''
+        try:
+            self._conn.execute('VACUUM')
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to compact snapshot store "%s": %s' % (self._db_path, str(ex)), base_ex=ex)
+
+    def close(self):
+        self._conn.close()
+
+    def __contains__(self, membership_id):
+        return self._fetch_one('SELECT 1 FROM snapshots WHERE membership_id = ?', membership_id) is not None
+
+    def __len__(self):
+        try:
+            return self._conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+        except sqlite3.DatabaseError, ex:
+            raise DAPIError('Unable to count snapshots: %s' % str(ex), base_ex=ex)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return '<SnapshotStore(path=%s)>' % self._db_path
+
+    db_path = property(fget=lambda self: self._db_path, doc='Snapshot Store Path')
+
+__all__ = ['SnapshotStore']